@@ -1,19 +1,38 @@
-import base64
+import asyncio
 import json
+import logging
 import os
-from typing import TYPE_CHECKING, Any, List, Dict, Optional, Callable, get_type_hints
+import re
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Dict, Optional, Set, Callable, get_type_hints
 
 from fastapi import WebSocket, WebSocketDisconnect
 from openai import AsyncOpenAI
+import websockets
 from websockets import WebSocketClientProtocol
 from rich.console import Console
 from rich.traceback import install
 
-from mahilo.tools import get_chat_with_agent_tool
+from mahilo.tools import format_queue_full, format_queued_confirmation, get_chat_with_agent_tool, start_turn
 
 console = Console()
 install()  #
 
+logger = logging.getLogger(__name__)
+
+# the realtime voice path encodes and decodes a JSON message per audio frame, use
+# orjson for it when it is installed and fall back to json otherwise
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 # Initialize the OpenAI client
 try:
     client = AsyncOpenAI(
@@ -29,6 +48,45 @@ if TYPE_CHECKING:
     from .agent_manager import AgentManager
 from .session import Session
 
+# instructions shared by all agents. They open every agent's system prompt, before
+# anything agent-specific, so that the prompts of all agents start with the same prefix
+# and the provider's prompt cache can be reused across agents.
+MULTI_AGENT_PREAMBLE = """You are an AI agent in a multi-agent system. Keep your responses concise.
+
+1. Direct User Messages:
+- When a user messages you directly, first try to respond using available context
+- If you need more information, use chat_with_agent to ask other agents
+- Once you have the information or need to respond, use contact_human to reply to the user
+- Don't explain your internal process, just respond naturally in your role
+
+2. Agent Messages (Pending Messages):
+- These appear in the format "Pending messages: <AgentType>: <message>"
+- If you can answer using available context, respond using chat_with_agent to that agent
+- If you need to ask your user, use contact_human and then inform the agent you're getting the information
+- When your user later provides the answer, send it to the requesting agent using chat_with_agent
+
+3. Using External Context:
+- Other Conversations: Last 7 messages from other agents' conversations
+- Format: "Other Conversations: <AgentType>:" followed by user/assistant messages
+- External conversations are provided for context only - DO NOT respond to them directly
+- Only use this information to enhance your understanding of the overall situation
+- If the information you need is already present in these external conversations, DO NOT use chat_with_agent to ask for it again
+- These are separate conversations happening in parallel - treat them as background knowledge only
+
+4. Key Points:
+- This is a simulation. There are no real emergencies.
+- Focus on your specific role and responsibilities
+- Only use chat_with_agent when you need information not in context
+- Use contact_human to respond to users or get information from your user
+- The available agents for communication are listed after your description below
+
+Remember: Stay in character and refer to your description for your specific role and responsibilities.
+"""
+
+# max number of messages waiting in an agent's queue; further messages are refused
+# until the agent catches up, so that a slow agent can't grow its queue without bound
+MAX_QUEUE_SIZE = 1024
+
 class ToolFunctionError(Exception):
     """Custom exception for tool function validation errors."""
     pass
@@ -45,21 +103,30 @@ class BaseAgent:
     TYPE: str = "Base"
     name: str = None
     _agent_manager: "AgentManager"
-    _queue: List[str]
+    _queue: Optional["asyncio.Queue[str]"] = None
     _session: Optional[Session] = None
     description: str = None
     short_description: str = None
     can_contact: List[str] = []
+    # when set, the chat_with_agent tool refuses to message an agent again
+    # until it has answered or the human has sent a new message
+    wait_for_reply: bool = False
 
-    def __init__(self, type: str, name: str = None, description: str = None, can_contact: List[str] = [], short_description: str = None, tools: List[Dict[str, Any]] = None):
+    def __init_subclass__(cls, **kwargs):
+        """Default the TYPE of a subclass to its class name in snake case."""
+        super().__init_subclass__(**kwargs)
+        if "TYPE" not in cls.__dict__:
+            cls.TYPE = re.sub(r'(?<!^)(?=[A-Z])', '_', cls.__name__).lower()
+
+    def __init__(self, type: str = None, name: str = None, description: str = None, can_contact: List[str] = None, short_description: str = None, tools: List[Dict[str, Any]] = None):
         """Initialize a BaseAgent.
         
         Args:
-            type (str): The type of agent (e.g. "story_weaver")
-            name (str, optional): Unique name for this agent instance
-            description (str, optional): Long description of the agent
-            can_contact (List[str], optional): List of agent types this agent can contact
-            short_description (str, optional): Brief description of the agent
+            type (str, optional): The type of agent (e.g. "story_weaver"). Defaults to the class's `TYPE`
+            name (str, optional): Unique name for this agent instance. Defaults to the class's `name`
+            description (str, optional): Long description of the agent. Defaults to the class's `description`
+            can_contact (List[str], optional): List of agent types this agent can contact. Defaults to the class's `can_contact`
+            short_description (str, optional): Brief description of the agent. Defaults to the class's `short_description`
             tools (List[Dict], optional): List of tool configurations. Each tool must contain:
                 - "tool": The OpenAI tool configuration
                 - "function": A callable that returns str or List[str]
@@ -67,14 +134,30 @@ class BaseAgent:
         Raises:
             ToolFunctionError: If any tool configuration or function is invalid
         """
-        self.TYPE = type
-        self.name = name or f"{type}_{id(self)}"  # Default to type_uniqueid if no name given
-        self._queue = []
-        self.description = description
-        self.can_contact = can_contact
-        self.short_description = short_description
+        # templates declare their type, name, descriptions and contacts on the class,
+        # only store them on the instance when they are given explicitly
+        if type is not None:
+            self.TYPE = type
+        self.name = name or self.name or f"{self.TYPE}_{id(self)}"  # Default to type_uniqueid if no name given
+        # messages from other agents, created in the running event loop on first use
+        self._queue = None
+        # event loop that waits on the queue, see add_message_to_queue
+        self._queue_loop: Optional[asyncio.AbstractEventLoop] = None
+        # names of the agents that were asked something and haven't answered yet
+        self._awaiting_reply: Set[str] = set()
+        if description is not None:
+            self.description = description
+        if can_contact is not None:
+            self.can_contact = can_contact
+        if short_description is not None:
+            self.short_description = short_description
         self._custom_tools = []
         self._custom_functions = {}
+        # realtime connection to OpenAI opened ahead of the next voice session.
+        # It is handed to one voice session only and never reused after that.
+        self._openai_ws: Optional[WebSocketClientProtocol] = None
+        self._openai_ws_lock: Optional[asyncio.Lock] = None
+        self._prewarm_task: Optional[asyncio.Task] = None
 
         if tools:
             for tool_config in tools:
@@ -92,14 +175,11 @@ class BaseAgent:
     # make a function that returns the list of agents with their descriptions that this agent can contact
     def get_contactable_agents_with_description(self) -> Dict[str, str]:
         """Return a dict of contactable agent names with their descriptions."""
-        all_available_agents_with_description = {
-            agent.name: agent.short_description 
-            for agent in self._agent_manager.get_all_agents()
-        }
+        can_contact = set(self.can_contact)
         return {
-            name: desc 
-            for name, desc in all_available_agents_with_description.items() 
-            if name in self.can_contact and name != self.name
+            agent.name: agent.short_description
+            for agent in self._agent_manager.get_all_agents()
+            if agent.name in can_contact and agent.name != self.name
         }
 
 
@@ -245,7 +325,7 @@ class BaseAgent:
         
         self._custom_tools.append(tool)
         self._custom_functions[tool_name] = func
-        print(f"Tool '{tool_name}' added to toolkit")
+        logger.info("Tool '%s' added to toolkit", tool_name)
 
     def remove_tool(self, tool_name: str) -> Dict[str, Any]:
         """Remove a tool and its function from the agent's toolkit by name.
@@ -276,7 +356,7 @@ class BaseAgent:
         removed_tool = self._custom_tools.pop(tool_index)
         removed_function = self._custom_functions.pop(tool_name)
                 
-        print(f"Tool '{tool_name}' removed from toolkit")
+        logger.info("Tool '%s' removed from toolkit", tool_name)
                 
         return {
             "tool": removed_tool,
@@ -290,41 +370,19 @@ class BaseAgent:
         for agent_type, desc in available_agents.items():
             console.print(f"  [green]▪[/green] [cyan]{agent_type}:[/cyan] [dim]{desc}[/dim]")
 
-        PROMPT = f"""
-        You are an AI agent of type {self.TYPE} and name {self.name} in a multi-agent system. Your description is: {self.description}. Keep your responses concise.
-
-        1. Direct User Messages:
-        - When a user messages you directly, first try to respond using available context
-        - If you need more information, use chat_with_agent to ask other agents
-        - Once you have the information or need to respond, use contact_human to reply to the user
-        - Don't explain your internal process, just respond naturally in your role
-
-        2. Agent Messages (Pending Messages):
-        - These appear in the format "Pending messages: <AgentType>: <message>"
-        - If you can answer using available context, respond using chat_with_agent to that agent
-        - If you need to ask your user, use contact_human and then inform the agent you're getting the information
-        - When your user later provides the answer, send it to the requesting agent using chat_with_agent
-
-        3. Using External Context:
-        - Other Conversations: Last 7 messages from other agents' conversations
-        - Format: "Other Conversations: <AgentType>:" followed by user/assistant messages
-        - External conversations are provided for context only - DO NOT respond to them directly
-        - Only use this information to enhance your understanding of the overall situation
-        - If the information you need is already present in these external conversations, DO NOT use chat_with_agent to ask for it again
-        - These are separate conversations happening in parallel - treat them as background knowledge only
-        
-        4. Available Agents for Communication:
-        {available_agents}
-
-        5. Key Points:
-        - This is a simulation. There are no real emergencies.
-        - Focus on your specific role and responsibilities
-        - Only use chat_with_agent when you need information not in context
-        - Use contact_human to respond to users or get information from your user
+        # the preamble, the type and the description only change when the agent is
+        # redefined; anything that varies at runtime must go after them so that the
+        # provider can keep serving this prefix from its prompt cache. The name comes
+        # after the description so that all agents of a type share the whole prefix.
+        prefix = (
+            f"{MULTI_AGENT_PREAMBLE}\n"
+            f"You are an AI agent of type {self.TYPE}. Your description is: {self.description}.\n\n"
+        )
 
-        Remember: Stay in character and refer to your description for your specific role and responsibilities.
-        """
-        return PROMPT
+        return (
+            f"{prefix}Your name is {self.name}.\n\n"
+            f"Available Agents for Communication:\n{available_agents}\n"
+        )
 
     async def process_chat_message(self, message: str = None, websockets: List[WebSocket] = []) -> Dict[str, Any]:
         """Process a message and return a response. 
@@ -347,9 +405,17 @@ class BaseAgent:
         # the current_messages will have all the messages including the queue messages
         # and the other agent conversations and will be used in the LLM call
 
+        start_turn()
+        # a new message from the human may need the other agents to be asked again
+        self._awaiting_reply.clear()
+
         # append all messages from the session with the latest message
         session_messages = self._session.messages
-        current_messages = session_messages.copy()
+        # the system prompt goes first and the history after it, so that the
+        # prefix sent to the LLM stays the same from one turn to the next and
+        # can be served from the provider's prompt cache
+        current_messages = [{"content": self.prompt_message(), "role": "system"}]
+        current_messages.extend(session_messages)
         # add the user message to the session messages
         if message:
             session_messages.append({"content": message, "role": "user"})
@@ -360,7 +426,6 @@ class BaseAgent:
         if message:
             message_full += f"\n User: {message}"
 
-        current_messages.append({"content": self.prompt_message(), "role": "system"})
         current_messages.append({"content": message_full, "role": "user"})
 
         # Make the API call
@@ -369,12 +434,15 @@ class BaseAgent:
             messages=current_messages,
             tools=[tool for tool in self.tools if tool["function"]["name"] != "contact_human"],
             tool_choice="auto",
+            parallel_tool_calls=True,
+            # agents of the same type share the start of their prompts; the key
+            # routes their requests to the same prompt cache
+            extra_body={"prompt_cache_key": self.TYPE},
         )
 
-        print(response.choices[0].message)
+        logger.debug("LLM response for %s: %s", self.name, response.choices[0].message)
 
-        # TODO support parallel function calling. we might want to add something like
-        # broadcast message to all agents, and see who responds first.
+        # the model may return several tool calls at once (parallel function calling)
         # if tools calls is not none, proceed
         response_message = response.choices[0].message
         tool_calls = response_message.tool_calls
@@ -390,61 +458,26 @@ class BaseAgent:
                 **self._custom_functions  # Add custom functions to available functions
             }
             
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_to_call = available_functions[function_name]
-                function_args = json.loads(tool_call.function.arguments)
-                try:
-                    if function_name == "contact_human":
-                        function_response = await function_to_call(**function_args, websockets=websockets)
-                    else:
-                        function_response = function_to_call(**function_args)
-                        # Convert responses to appropriate string format
-                        if isinstance(function_response, dict):
-                            function_response = json.dumps(function_response)
-                        elif isinstance(function_response, list):
-                            function_response = [
-                                json.dumps(item) if isinstance(item, dict) else str(item)
-                                for item in function_response
-                            ]
-                except Exception as e:
-                    print(f"Error calling function {function_name}: {e}")
+            # run the tool calls of this response concurrently
+            tool_messages = await asyncio.gather(*(
+                self._run_tool_call(tool_call, available_functions, websockets)
+                for tool_call in tool_calls
+            ))
+            for tool_message in tool_messages:
+                if tool_message is None:
                     continue
-
-                func_resp = ""
-                # make one str from the function_response list of str
-                for resp in function_response:
-                    func_resp += resp
-
-                # console log the function called and its response in suitable formatting
-                console.print(f"[bold green] 🛠️  Function called:[/bold green] {function_name}")
-                console.print(f"[bold blue]Function response:[/bold blue] {func_resp}")
-
-                # append the response from the function to the messages
-                current_messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": func_resp,
-                    }
-                )
-                session_messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": func_resp,
-                    }
-                )
+                current_messages.append(tool_message)
+                session_messages.append(tool_message)
 
             response = await client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=current_messages,
                 tools=[tool for tool in self.tools if tool["function"]["name"] != "contact_human"],
                 tool_choice="auto",
+                parallel_tool_calls=True,
+                extra_body={"prompt_cache_key": self.TYPE},
             )
-            print(response.choices[0].message)
+            logger.debug("LLM response for %s: %s", self.name, response.choices[0].message)
             tool_calls = response.choices[0].message.tool_calls
 
             # convert response_message ChatCompletionMessage to dict
@@ -479,16 +512,20 @@ class BaseAgent:
         - it should use the openai function calling API to generate a response
 
         """
+        start_turn()
         session_messages = self._session.messages
-        current_messages = session_messages.copy()
+        # the system prompt goes first and the history after it, so that the
+        # prefix sent to the LLM stays the same from one turn to the next and
+        # can be served from the provider's prompt cache
+        current_messages = [{"content": self.prompt_message(), "role": "system"}]
+        current_messages.extend(session_messages)
 
         if message:
             queue_message = f"Pending messages: {message}"
 
-        print(f"Queue message for {self.TYPE}: {queue_message}")
+        logger.debug("Queue message for %s: %s", self.TYPE, queue_message)
 
         session_messages.append({"content": queue_message, "role": "user"})
-        current_messages.append({"content": self.prompt_message(), "role": "system"})
         current_messages.append({"content": queue_message, "role": "user"})
 
         # Make the API call
@@ -497,12 +534,15 @@ class BaseAgent:
             messages=current_messages,
             tools=self.tools,
             tool_choice="auto",
+            parallel_tool_calls=True,
+            # agents of the same type share the start of their prompts; the key
+            # routes their requests to the same prompt cache
+            extra_body={"prompt_cache_key": self.TYPE},
         )
 
-        print("In queue fn:", response.choices[0].message)
+        logger.debug("LLM response to queue message for %s: %s", self.name, response.choices[0].message)
 
-        # TODO support parallel function calling. we might want to add something like
-        # broadcast message to all agents, and see who responds first.
+        # the model may return several tool calls at once (parallel function calling)
         # if tools calls is not none, proceed
         response_message = response.choices[0].message
         tool_calls = response_message.tool_calls
@@ -518,61 +558,26 @@ class BaseAgent:
                 **self._custom_functions  # Add custom functions to available functions
             }
             
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_to_call = available_functions[function_name]
-                function_args = json.loads(tool_call.function.arguments)
-                try:
-                    if function_name == "contact_human":
-                        function_response = await function_to_call(**function_args, websockets=websockets)
-                    else:
-                        function_response = function_to_call(**function_args)
-                        # Convert responses to appropriate string format
-                        if isinstance(function_response, dict):
-                            function_response = json.dumps(function_response)
-                        elif isinstance(function_response, list):
-                            function_response = [
-                                json.dumps(item) if isinstance(item, dict) else str(item)
-                                for item in function_response
-                            ]
-                except Exception as e:
-                    print(f"Error calling function {function_name}: {e}")
+            # run the tool calls of this response concurrently
+            tool_messages = await asyncio.gather(*(
+                self._run_tool_call(tool_call, available_functions, websockets)
+                for tool_call in tool_calls
+            ))
+            for tool_message in tool_messages:
+                if tool_message is None:
                     continue
-
-                func_resp = ""
-                # make one str from the function_response list of str
-                for resp in function_response:
-                    func_resp += resp
-
-                # console log the function called and its response in suitable formatting
-                console.print(f"[bold green] 🛠️  Function called:[/bold green] {function_name}")
-                console.print(f"[bold blue] Function response:[/bold blue] {func_resp}")
-
-                # append the response from the function to the messages
-                current_messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": func_resp,
-                    }
-                )
-                session_messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": func_resp,
-                    }
-                )
+                current_messages.append(tool_message)
+                session_messages.append(tool_message)
 
             response = await client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=current_messages,
                 tools=self.tools,
                 tool_choice="auto",
+                parallel_tool_calls=True,
+                extra_body={"prompt_cache_key": self.TYPE},
             )
-            print("In queue fn:", response.choices[0].message)
+            logger.debug("LLM response to queue message for %s: %s", self.name, response.choices[0].message)
             tool_calls = response.choices[0].message.tool_calls
 
             # convert response_message ChatCompletionMessage to dict
@@ -585,7 +590,48 @@ class BaseAgent:
 
         # After processing, return the response and the list of all current agents that are active
         activated_agents = [agent for agent in self._agent_manager.get_all_agents() if agent.is_active() and agent.name != self.name]
-        print(f"Activated agents: {[agent.name for agent in activated_agents]}")
+        logger.debug("Activated agents: %s", [agent.name for agent in activated_agents])
+
+    async def _run_tool_call(self, tool_call: Any, available_functions: Dict[str, Callable], websockets: List[WebSocket]) -> Optional[Dict[str, Any]]:
+        """Run one tool call requested by the LLM.
+
+        Returns the tool message with the function's response, or None if the function failed.
+        """
+        function_name = tool_call.function.name
+        function_to_call = available_functions[function_name]
+        function_args = json.loads(tool_call.function.arguments)
+        try:
+            if function_name == "contact_human":
+                function_response = await function_to_call(**function_args, websockets=websockets)
+            else:
+                function_response = function_to_call(**function_args)
+                # Convert responses to appropriate string format
+                if isinstance(function_response, dict):
+                    function_response = json.dumps(function_response)
+                elif isinstance(function_response, list):
+                    function_response = [
+                        json.dumps(item) if isinstance(item, dict) else str(item)
+                        for item in function_response
+                    ]
+        except Exception as e:
+            logger.error("Error calling function %s: %s", function_name, e)
+            return None
+
+        func_resp = ""
+        # make one str from the function_response list of str
+        for resp in function_response:
+            func_resp += resp
+
+        # console log the function called and its response in suitable formatting
+        console.print(f"[bold green] 🛠️  Function called:[/bold green] {function_name}")
+        console.print(f"[bold blue]Function response:[/bold blue] {func_resp}")
+
+        return {
+            "tool_call_id": tool_call.id,
+            "role": "tool",
+            "name": function_name,
+            "content": func_resp,
+        }
 
     async def _send_session_update(self, openai_ws: WebSocketClientProtocol) -> None:
         """Send the session update to the OpenAI WebSocket."""
@@ -609,24 +655,92 @@ class BaseAgent:
                 "temperature": 0.8,
             }
         }
-        print(f'Sending session update for {self.TYPE}:', json.dumps(session_update))        
+        logger.debug("Sending session update for %s: %s", self.TYPE, session_update)
         await openai_ws.send(json.dumps(session_update))
 
+    async def _open_openai_ws(self, ws_url: str, headers: Dict[str, str]) -> WebSocketClientProtocol:
+        """Open a realtime connection to OpenAI."""
+        return await websockets.connect(ws_url, extra_headers=headers, compression="deflate")
+
+    async def _take_prewarmed_openai_ws(self) -> Optional[WebSocketClientProtocol]:
+        """Take the prewarmed connection if there is a healthy one, so that no one else gets it."""
+        openai_ws, self._openai_ws = self._openai_ws, None
+        if openai_ws is None or not openai_ws.open:
+            return None
+        try:
+            pong_waiter = await openai_ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout=5)
+            return openai_ws
+        except Exception as e:
+            logger.warning("Prewarmed OpenAI connection for %s is unhealthy, reconnecting: %s", self.TYPE, e)
+            await openai_ws.close()
+            return None
+
+    @asynccontextmanager
+    async def openai_ws_connection(self, ws_url: str, headers: Dict[str, str]) -> AsyncIterator[WebSocketClientProtocol]:
+        """Provide a realtime connection to OpenAI for one voice session.
+
+        The session gets the prewarmed connection when there is one and a new
+        connection otherwise. The session update is sent when the voice session
+        starts, so that it has the agent's current prompt and tools. A realtime
+        session keeps its conversation and any response that is still streaming,
+        so the connection is closed when the voice session ends instead of being
+        reused.
+        """
+        openai_ws = await self._take_prewarmed_openai_ws()
+        if openai_ws is None:
+            openai_ws = await self._open_openai_ws(ws_url, headers)
+        try:
+            await self._send_session_update(openai_ws)
+            yield openai_ws
+        finally:
+            await openai_ws.close()
+
+    def start_prewarm_openai_ws(self, ws_url: str, headers: Dict[str, str]) -> None:
+        """Prewarm the realtime connection in the background, see prewarm_openai_ws.
+
+        close_openai_ws cancels the task.
+        """
+        if self._prewarm_task is not None and not self._prewarm_task.done():
+            return
+        self._prewarm_task = asyncio.create_task(self.prewarm_openai_ws(ws_url, headers))
+
+    async def prewarm_openai_ws(self, ws_url: str, headers: Dict[str, str]) -> None:
+        """Open a realtime connection ahead of the next voice session, if there isn't one."""
+        if self._openai_ws_lock is None:
+            self._openai_ws_lock = asyncio.Lock()
+        try:
+            async with self._openai_ws_lock:
+                if self._openai_ws is not None and self._openai_ws.open:
+                    return
+                self._openai_ws = await self._open_openai_ws(ws_url, headers)
+        except Exception as e:
+            logger.error("Error prewarming OpenAI connection for %s: %s", self.TYPE, e)
+
+    async def close_openai_ws(self) -> None:
+        """Stop prewarming and close the prewarmed realtime connection, if any."""
+        prewarm_task, self._prewarm_task = self._prewarm_task, None
+        if prewarm_task is not None:
+            prewarm_task.cancel()
+            await asyncio.gather(prewarm_task, return_exceptions=True)
+        openai_ws, self._openai_ws = self._openai_ws, None
+        if openai_ws is not None and openai_ws.open:
+            await openai_ws.close()
+
     async def _receive_from_client(self, websocket: WebSocket, openai_ws: WebSocketClientProtocol) -> None:
         """Receive a message from the client."""
         try:
-            async for message in websocket.iter_json():
+            async for text in websocket.iter_text():
+                message = _json_loads(text)
                 if message['event'] == 'media' and openai_ws.open:
                     audio_append = {
                         "type": "input_audio_buffer.append",
                         "audio": message['media']['payload']
                     }
-                    await openai_ws.send(json.dumps(audio_append))
+                    await openai_ws.send(_json_dumps(audio_append))
                 # TODO: Handle other event types if needed
         except WebSocketDisconnect:
-            print("Client disconnected.")
-            if openai_ws.open:
-                await openai_ws.close()
+            logger.info("Client disconnected.")
 
     async def _send_to_client(self, websocket: WebSocket, openai_ws: WebSocketClientProtocol) -> None:
         """Send a message to the client."""
@@ -635,29 +749,29 @@ class BaseAgent:
         }
         try:
             async for openai_message in openai_ws:
-                response = json.loads(openai_message)
+                response = _json_loads(openai_message)
                 function_call_args = {}
                 if response['type'] == 'session.updated':
-                    print("Session updated successfully:", response)
+                    logger.debug("Session updated successfully: %s", response)
                 if response['type'] == 'response.audio.delta' and response.get('delta'):
                     try:
-                        audio_payload = base64.b64encode(base64.b64decode(response['delta'])).decode('utf-8')
+                        # the delta is already base64 encoded audio, pass it on as is
                         audio_delta = {
                             "event": "media",
                             "media": {
-                                "payload": audio_payload
+                                "payload": response['delta']
                             }
                         }
                         # if websocket is not open, then don't send the message
-                        await websocket.send_json(audio_delta)
+                        await websocket.send_text(_json_dumps(audio_delta))
                     except Exception as e:
-                        print(f"Error processing audio data: {e}")
+                        logger.error("Error processing audio data: %s", e)
 
                 if response['type'] == 'response.output_item.done':
-                    print(f"Received response.output_item.done: {response}")
+                    logger.debug("Received response.output_item.done: %s", response)
                     if "item" in response and response["item"]["type"] == "function_call":
                         item = response["item"]
-                        print(f"Function call: {item}")
+                        logger.debug("Function call: %s", item)
                         function_to_call = available_functions[item["name"]]
                         function_args = json.loads(item["arguments"])
                         # if the arguments are the same as the previous function call, then skip it
@@ -665,10 +779,10 @@ class BaseAgent:
                             continue
                         try:
                             function_response = function_to_call(**function_args)
-                            print(f"Function response: {function_response}")
+                            logger.debug("Function response: %s", function_response)
                             function_call_args = function_args
                         except Exception as e:
-                            print(f"Error calling function {item['name']}: {e}")
+                            logger.error("Error calling function %s: %s", item['name'], e)
                             pass
 
                         func_resp = ""
@@ -698,11 +812,76 @@ class BaseAgent:
                         }
                         await openai_ws.send(json.dumps(response_create))
         except Exception as e:
-            print(f"Error in send_to_client: {e}")
+            logger.error("Error in send_to_client: %s", e)
+
+    def _get_queue(self) -> "asyncio.Queue[str]":
+        """Return the agent's queue, creating it on first use."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+        return self._queue
+
+    def bind_to_running_loop(self) -> None:
+        """Recreate the agent's asyncio queue and lock for the running event loop.
+
+        They bind to the first loop that waits on them, so a server started again in
+        the same process (e.g. by a second asyncio.run) needs new ones. Messages still
+        waiting in the old queue move over to the new one.
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue_loop is loop:
+            return
+        old_queue, self._queue = self._queue, asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+        while old_queue is not None and not old_queue.empty():
+            self._queue.put_nowait(old_queue.get_nowait())
+        self._queue_loop = loop
+        self._openai_ws_lock = None
 
     def add_message_to_queue(self, message: str, sender: str) -> None:
-        """Add a message to the agent's queue."""
-        self._queue.append(f"{sender}: {message}")
+        """Add a message to the agent's queue, waking up whoever waits on it.
+
+        Can be called from any thread, e.g. by a sync tool that an integration runs
+        in an executor.
+
+        Raises:
+            asyncio.QueueFull: If the agent already has MAX_QUEUE_SIZE messages waiting
+        """
+        queue = self._get_queue()
+        item = f"{sender}: {message}"
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if self._queue_loop is None or self._queue_loop.is_closed() or running_loop is self._queue_loop:
+            queue.put_nowait(item)
+            return
+        # asyncio queues aren't thread-safe, let the loop that waits on it do the put
+        if queue.full():
+            raise asyncio.QueueFull
+        self._queue_loop.call_soon_threadsafe(self._put_queued_message, item)
+
+    def _put_queued_message(self, item: str) -> None:
+        """Put a message handed over from another thread in the agent's queue."""
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.warning("Queue of %s is full, dropped message: %s", self.name, item)
+
+    def queue_size(self) -> int:
+        """Return the number of messages waiting in the agent's queue."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def next_queue_messages(self, max_messages: int) -> List[str]:
+        """Wait for the next message in the agent's queue.
+
+        Returns it together with the messages already waiting behind it, up to
+        `max_messages` in total.
+        """
+        queue = self._get_queue()
+        self._queue_loop = asyncio.get_running_loop()
+        messages = [await queue.get()]
+        while len(messages) < max_messages and not queue.empty():
+            messages.append(queue.get_nowait())
+        return messages
 
     def is_active(self) -> bool:
         """Check if the agent is active."""
@@ -711,7 +890,9 @@ class BaseAgent:
     
     def activate(self, server_id: str = None, dependencies: Any = None) -> None:
         """Activate the agent."""
-        self._session = Session(self.TYPE, server_id)
+        # every agent has its own session file, agents of the same type don't share one.
+        # Sessions used to be keyed by type, an existing file of the type moves over.
+        self._session = Session(self.name, server_id, legacy_name=self.TYPE)
 
     def chat_with_agent(self, agent_name: str, question: str) -> str:
         """Chat with the agent of the given name."""
@@ -723,17 +904,24 @@ class BaseAgent:
         if not agent.is_active():
             agent.activate()
         # add the question to the agent's queue
-        agent.add_message_to_queue(question, self.name)
+        try:
+            agent.add_message_to_queue(question, self.name)
+        except asyncio.QueueFull:
+            return format_queue_full(agent_name=agent_name)
 
-        return (
-            f"I have put the question '{question}' in the queue for the agent named {agent_name}. "
-            "You will hear back soon."
-        )
+        return format_queued_confirmation(question=question, agent_name=agent_name)
     
+    async def _broadcast(self, message: str, websockets: List[WebSocket]) -> None:
+        """Send a message to all the websockets at once, so that a slow client doesn't delay the others."""
+        results = await asyncio.gather(*(ws.send_text(message) for ws in websockets), return_exceptions=True)
+        for result in results:
+            # a failed send only affects its own client, whose handler cleans it up
+            if isinstance(result, Exception):
+                console.print(f"[bold red] ⛔  Error sending message to a client of {self.name}:[/bold red] {result}")
+
     async def contact_human(self, message: str, websockets: List[WebSocket] = []) -> None:
         """Respond to the human."""
-        for ws in websockets:
-            await ws.send_text(message)
+        await self._broadcast(message, websockets)
         return f"I have sent your message to the human as I don't have the information in context."
 
     def _validate_tool_function(self, func: Callable, tool_name: str) -> None:
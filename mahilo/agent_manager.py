@@ -1,4 +1,5 @@
-from typing import Dict, List
+from typing import Callable, Dict, List
+
 from .agent import BaseAgent
 from .registry import GlobalRegistry
 
@@ -10,6 +11,10 @@ class AgentManager:
     """
     def __init__(self):
         self.agents: Dict[str, BaseAgent] = {}
+        # called with every agent that is registered, see on_register
+        self._register_callbacks: List[Callable[[BaseAgent], None]] = []
+        # called with every agent that is unregistered, see on_unregister
+        self._unregister_callbacks: List[Callable[[BaseAgent], None]] = []
         # Register self with global registry
         GlobalRegistry.set_agent_registry(self)
 
@@ -19,6 +24,16 @@ class AgentManager:
             raise ValueError(f"Agent with name {agent.name} is already registered.")
         agent._agent_manager = self
         self.agents[agent.name] = agent
+        for callback in self._register_callbacks:
+            callback(agent)
+
+    def on_register(self, callback: Callable[[BaseAgent], None]) -> None:
+        """Call the given function with every agent registered from now on."""
+        self._register_callbacks.append(callback)
+
+    def on_unregister(self, callback: Callable[[BaseAgent], None]) -> None:
+        """Call the given function with every agent unregistered from now on."""
+        self._unregister_callbacks.append(callback)
 
     def get_agent(self, agent_name: str) -> BaseAgent:
         """Return the agent of the given name."""
@@ -38,12 +53,15 @@ class AgentManager:
 
     def unregister_agent(self, agent_name: str) -> None:
         """Unregister the agent of the given name."""
-        if agent_name in self.agents:
-            del self.agents[agent_name]
+        agent = self.agents.pop(agent_name, None)
+        if agent is not None:
+            for callback in self._unregister_callbacks:
+                callback(agent)
 
     def unregister_all_agents(self) -> None:
         """Unregister all agents."""
-        self.agents.clear()
+        for agent_name in list(self.agents):
+            self.unregister_agent(agent_name)
 
     def get_agent_types_with_description(self) -> Dict[str, str]:
         """Return a list of all registered agent types with their descriptions."""
@@ -1,4 +1,7 @@
+import logging
+
 from mahilo.agent import BaseAgent
+from mahilo.tools import start_turn
 from typing import Any, Dict, List
 from fastapi import WebSocket
 from langgraph.graph import StateGraph
@@ -8,6 +11,8 @@ from rich.traceback import install
 console = Console()
 install()  #
 
+logger = logging.getLogger(__name__)
+
 class LangGraphAgent(BaseAgent):
     """Adapter class to use langgraph agents within the mahilo framework."""
     
@@ -60,6 +65,7 @@ class LangGraphAgent(BaseAgent):
         """Process a message using the langgraph agent's invoke method."""
         if not message:
             return {"response": "", "activated_agents": []}
+        start_turn()
 
         # Get context from other agents
         other_agent_messages = self._agent_manager.get_agent_messages(self.name, num_messages=7)
@@ -90,8 +96,8 @@ class LangGraphAgent(BaseAgent):
             if agent.is_active() and agent.name != self.name
         ]
 
-        print("Activated agents:", activated_agents)
-        print(f"In process_chat_message: Response for {self.name}: {response_text}")
+        logger.debug("Activated agents: %s", activated_agents)
+        logger.debug("In process_chat_message: Response for %s: %s", self.name, response_text)
 
         return {
             "response": response_text,
@@ -102,6 +108,7 @@ class LangGraphAgent(BaseAgent):
         """Process a queue message using the langgraph agent."""
         if not message:
             return
+        start_turn()
 
         available_agents = self.get_contactable_agents_with_description()
         if message:
@@ -112,7 +119,7 @@ class LangGraphAgent(BaseAgent):
             message_full += f"\n Available agents to chat with: {available_agents} "
             message_full += f"Your Agent Name: {self.name}"
 
-        print(f"Queue message for {self.name}: {message_full}")
+        logger.debug("Queue message for %s: %s", self.name, message_full)
 
         messages = [("user", message_full)]
         messages.append(("system", self.description))
@@ -125,7 +132,6 @@ class LangGraphAgent(BaseAgent):
 
         response_text = response["messages"][-1].content
         # send the response to the websockets
-        for ws in websockets:
-            await ws.send_text(response_text)
+        await self._broadcast(response_text, websockets)
 
-        print(f"In process_queue_message: Response for {self.name}: {response_text}")
+        logger.debug("In process_queue_message: Response for %s: %s", self.name, response_text)
@@ -1,6 +1,8 @@
+import logging
 from typing import Any, Dict, List, Optional
 from fastapi import WebSocket
 from mahilo.agent import BaseAgent
+from mahilo.tools import start_turn
 from pydantic_ai import Agent, RunContext
 from rich.console import Console
 
@@ -8,6 +10,8 @@ from mahilo.integrations.pydanticai.tools import get_chat_with_agent_tool_pydant
 
 console = Console()
 
+logger = logging.getLogger(__name__)
+
 class PydanticAIAgent(BaseAgent):
     """Adapter class to use PydanticAI agents within the mahilo framework."""
     
@@ -64,6 +68,7 @@ class PydanticAIAgent(BaseAgent):
         """Process a message using the PydanticAI agent's run method."""
         if not message:
             return {"response": "", "activated_agents": []}
+        start_turn()
 
         # Get context from other agents
         other_agent_messages = self._agent_manager.get_agent_messages(self.name, num_messages=7)
@@ -78,8 +83,8 @@ class PydanticAIAgent(BaseAgent):
             message_full += f"\n Available agents to chat with: {available_agents}"
             message_full += f"\n Your Agent Name: {self.name}"
         
-        print("System prompts:", self._pydantic_agent._system_prompts)
-        print("Function tools:", self._pydantic_agent._function_tools)
+        logger.debug("System prompts: %s", self._pydantic_agent._system_prompts)
+        logger.debug("Function tools: %s", self._pydantic_agent._function_tools)
         # Run the PydanticAI agent
         result = await self._pydantic_agent.run(message_full, deps=self._dependencies)
         
@@ -92,8 +97,8 @@ class PydanticAIAgent(BaseAgent):
             if agent.is_active() and agent.name != self.name
         ]
 
-        print("Activated agents:", activated_agents)
-        print(f"In process_chat_message: Response for {self.name}: {response_text}")
+        logger.debug("Activated agents: %s", activated_agents)
+        logger.debug("In process_chat_message: Response for %s: %s", self.name, response_text)
 
         return {
             "response": response_text,
@@ -104,9 +109,10 @@ class PydanticAIAgent(BaseAgent):
         """Process a queue message using the PydanticAI agent."""
         if not message:
             return
+        start_turn()
 
         message_full = f"Message from: {message}"
-        print(f"Queue message for {self.name}: {message_full}")
+        logger.debug("Queue message for %s: %s", self.name, message_full)
         
         available_agents = self.get_contactable_agents_with_description()
         if message:
@@ -121,7 +127,6 @@ class PydanticAIAgent(BaseAgent):
         response_text = str(result.data)
 
         # Send the response to the websockets
-        for ws in websockets:
-            await ws.send_text(response_text)
+        await self._broadcast(response_text, websockets)
 
-        print(f"In process_queue_message: Response for {self.name}: {response_text}")
\ No newline at end of file
+        logger.debug("In process_queue_message: Response for %s: %s", self.name, response_text)
\ No newline at end of file
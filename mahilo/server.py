@@ -1,34 +1,92 @@
+import logging
 import os
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from typing import Dict
+from typing import DefaultDict, Dict, List, Optional, Set
 import uvicorn
 import asyncio
-import uuid
-
-import websockets
+import functools
+from collections import defaultdict
 
 from rich.console import Console
+from rich.markup import escape
 from rich.traceback import install
 
 ## TODO add instructor
 
+from .agent import BaseAgent
 from .agent_manager import AgentManager
 
+logger = logging.getLogger(__name__)
+
+# max number of console messages waiting to be printed; when it is full newer ones are
+# dropped, except errors, which are printed right away
+LOG_QUEUE_SIZE = 1024
+
+# max number of agents processing queue messages at the same time
+MAX_CONCURRENT_AGENTS = 8
+
+# max number of queued messages of an agent that are handed to its LLM in one call
+QUEUE_BATCH_SIZE = 64
+
+# seconds between checks whether an agent with queued messages has been activated
+INACTIVE_AGENT_POLL_INTERVAL = 1
+
+VOICE_UNAVAILABLE_MESSAGE = "Azure OpenAI credentials not configured. Voice streaming is unavailable."
+
+@functools.lru_cache(maxsize=1024)
+def _agent_not_registered_message(agent_name: str) -> str:
+    return f"Error: Agent '{agent_name}' is not registered with the server"
+
+@functools.lru_cache(maxsize=1024)
+def _agent_not_active_message(agent_name: str) -> str:
+    return f"Agent {agent_name} is not active."
+
+# prefer the C-based event loop and HTTP parser when they are available
+# (uvloop is not supported on Windows); fall back to the pure-Python ones.
+try:
+    import uvloop  # noqa: F401
+    _UVICORN_LOOP = "uvloop"
+except ImportError:
+    _UVICORN_LOOP = "asyncio"
+
+try:
+    import httptools  # noqa: F401
+    _UVICORN_HTTP = "httptools"
+except ImportError:
+    _UVICORN_HTTP = "h11"
+
 class ServerManager:
     def __init__(self, agent_manager: AgentManager):
         self.app = FastAPI()
         self.agent_manager = agent_manager
-        self.websocket_connections: Dict[str, Dict[str, WebSocket]] = {}
+        self.websocket_connections: DefaultDict[str, Set[WebSocket]] = defaultdict(set)
+        # list of the websockets of each agent, rebuilt only when its connections change
+        self._agent_ws_snapshot: Dict[str, List[WebSocket]] = {}
         self.endpoint = os.getenv("AZURE_OPENAI_ENDPOINT", None)
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT", None)
         self.key = os.getenv("AZURE_OPENAI_KEY", None)
         self.token_provider = None
 
         self.agent_manager.populate_can_contact_for_agents()
+        # allocate the connection tables of all registered agents up front
+        for agent in self.agent_manager.get_all_agents():
+            self.websocket_connections[agent.name] = set()
+            self._agent_ws_snapshot[agent.name] = []
         self._setup_routes()
 
         self.console = Console()
         install()  # This enables rich traceback formatting for exceptions
+        # console messages from the websocket handlers, printed by _log_worker
+        self._log_queue: Optional[asyncio.Queue] = None
+        self._log_task: Optional[asyncio.Task] = None
+        # caps concurrent queue processing across agents, created on first use
+        self._agent_semaphore: Optional[asyncio.Semaphore] = None
+        # task of each agent that processes its queue messages, see _ensure_pump
+        self._agent_pumps: Dict[str, asyncio.Task] = {}
+        self._started = False
+        # agents registered while the server runs get their task right away
+        self.agent_manager.on_register(self._on_agent_registered)
+        self.agent_manager.on_unregister(self._on_agent_unregistered)
 
     def _setup_routes(self):
         @self.app.websocket("/ws/voice-stream/{agent_name}")
@@ -37,44 +95,49 @@ class ServerManager:
             
             agent = self.agent_manager.get_agent(agent_name)
             if not agent:
-                self.console.print(f"[bold red]⛔  Agent not found:[/bold red] [green]{agent_name}[/green]")
-                await websocket.send_text(f"Error: Agent '{agent_name}' is not registered with the server")
+                self._log(f"[bold red]⛔  Agent not found:[/bold red] [green]{agent_name}[/green]")
+                await websocket.send_text(_agent_not_registered_message(agent_name))
                 await websocket.close(1008)  # Using 1008 (Policy Violation) status code
                 return
 
-            self.console.print(f"[bold blue]🎙️ New voice stream connection[/bold blue] for agent: [green]{agent_name}[/green]")
+            self._log(f"[bold blue]🎙️ New voice stream connection[/bold blue] for agent: [green]{agent_name}[/green]")
 
             if not all([self.endpoint, self.deployment, self.key]):
-                await websocket.send_text("Azure OpenAI credentials not configured. Voice streaming is unavailable.")
+                await websocket.send_text(VOICE_UNAVAILABLE_MESSAGE)
                 await websocket.close(1008)  # Using 1008 (Policy Violation) status code
                 return
             
-            connection_id = str(uuid.uuid4())
-            
-            if agent_name not in self.websocket_connections:
-                self.websocket_connections[agent_name] = {}            
-            self.websocket_connections[agent_name][connection_id] = websocket
+            self._add_connection(agent_name, websocket)
 
             try:
-                headers = {}
-                if self.key is not None:
-                    headers = { "api-key": self.key }
-                # add params to the url without using urllib
-                ws_url = f"{self.endpoint}/openai/realtime?api-version=2024-10-01-preview&deployment={self.deployment}"
-                async with websockets.connect(ws_url, extra_headers=headers) as openai_ws:
-                    await agent._send_session_update(openai_ws)
-                    await asyncio.gather(
-                        agent._receive_from_client(websocket, openai_ws),
-                        agent._send_to_client(websocket, openai_ws)
-                    )
+                async with agent.openai_ws_connection(self._realtime_url(), self._realtime_headers()) as openai_ws:
+                    # run both directions as independent long-lived tasks so that
+                    # each one streams frames on its own; when either side ends,
+                    # the other one is torn down.
+                    recv_task = asyncio.create_task(agent._receive_from_client(websocket, openai_ws))
+                    send_task = asyncio.create_task(agent._send_to_client(websocket, openai_ws))
+                    done, pending = set(), {recv_task, send_task}
+                    try:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        for task in pending:
+                            task.cancel()
+                        await asyncio.gather(*pending, return_exceptions=True)
+                    for task in done:
+                        # re-raise any exception from the finished direction
+                        task.result()
 
             except WebSocketDisconnect:
-                self.console.print(f"[bold yellow]⚠️  WebSocket disconnected[/bold yellow] for agent: [green]{agent_name}[/green]")
-                del self.websocket_connections[agent_name][connection_id]
-                if not self.websocket_connections[agent_name]:
-                    del self.websocket_connections[agent_name]
+                self._log(f"[bold yellow]⚠️  WebSocket disconnected[/bold yellow] for agent: [green]{agent_name}[/green]")
             except Exception as e:
-                self.console.print(f"[bold red]⛔  Error in voice stream:[/bold red] {str(e)}", style="red")
+                self._log(f"[bold red]⛔  Error in voice stream:[/bold red] {str(e)}", style="red")
+            finally:
+                # the client may also have left without a WebSocketDisconnect reaching us
+                self._remove_connection(agent_name, websocket)
+                # open a connection for the agent's next voice session, unless the
+                # server is shutting down
+                if self._started:
+                    agent.start_prewarm_openai_ws(self._realtime_url(), self._realtime_headers())
         
         @self.app.websocket("/ws/{agent_name}")
         async def websocket_endpoint(websocket: WebSocket, agent_name: str):
@@ -82,62 +145,191 @@ class ServerManager:
 
             agent = self.agent_manager.get_agent(agent_name)
             if not agent:
-                self.console.print(f"[bold red]⛔  Agent not found:[/bold red] [green]{agent_name}[/green]")
-                await websocket.send_text(f"Error: Agent '{agent_name}' is not registered with the server")
+                self._log(f"[bold red]⛔  Agent not found:[/bold red] [green]{agent_name}[/green]")
+                await websocket.send_text(_agent_not_registered_message(agent_name))
                 await websocket.close(1008)
                 return
             
-            self.console.print(f"[bold blue]🔌 New WebSocket connection[/bold blue] for agent: [green]{agent_name}[/green]")
+            self._log(f"[bold blue]🔌 New WebSocket connection[/bold blue] for agent: [green]{agent_name}[/green]")
             
-            connection_id = str(uuid.uuid4())
-            
-            if agent_name not in self.websocket_connections:
-                self.websocket_connections[agent_name] = {}            
-            self.websocket_connections[agent_name][connection_id] = websocket
+            self._add_connection(agent_name, websocket)
 
             try:
-                print(f"Agent retrieved: {agent}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    self._log(f"[dim]Agent retrieved:[/dim] {escape(str(agent))}", debug=True)
                 while True:
                     data = await websocket.receive_text()
-                    self.console.print(f"[dim blue]📨 Received message for agent:[/dim blue] [green]{agent_name}[/green]: [dim]{data}[/dim]")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        self._log(f"[dim]Received message for agent[/dim] [green]{agent_name}[/green]: {escape(data)}", debug=True)
                     # if the agent is not active, ignore the message
                     if not agent.is_active():
-                        self.console.print(f"[bold yellow]⚠️  Agent[/bold yellow] [green]{agent_name}[/green] [bold yellow]is not active[/bold yellow]")
-                        await websocket.send_text(f"Agent {agent_name} is not active.")
+                        if logger.isEnabledFor(logging.DEBUG):
+                            self._log(f"[dim]Agent[/dim] [green]{agent_name}[/green] [dim]is not active[/dim]", debug=True)
+                        await websocket.send_text(_agent_not_active_message(agent_name))
                         continue
                     response = await agent.process_chat_message(data, websockets=[websocket])
                     await websocket.send_text(response["response"])
             except WebSocketDisconnect:
-                self.console.print(f"[bold yellow]⚠️  WebSocket disconnected[/bold yellow] for agent: [green]{agent_name}[/green]")
-                del self.websocket_connections[agent_name][connection_id]
-                if not self.websocket_connections[agent_name]:
-                    print(f"No connections left for agent: {agent_name}")
-                    del self.websocket_connections[agent_name]
+                self._log(f"[bold yellow]⚠️  WebSocket disconnected[/bold yellow] for agent: [green]{agent_name}[/green]")
             except Exception as e:
-                self.console.print(f"[bold red]⛔  Error in websocket:[/bold red] {str(e)}", style="red")
+                self._log(f"[bold red]⛔  Error in websocket:[/bold red] {str(e)}", style="red")
+            finally:
+                self._remove_connection(agent_name, websocket)
 
         @self.app.on_event("startup")
         async def startup_event():
-            asyncio.create_task(self._handle_inter_agent_communication())
+            self._log_queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+            self._log_task = asyncio.create_task(self._log_worker())
+            # a semaphore from a previous run of the app is bound to that run's event loop
+            self._agent_semaphore = asyncio.Semaphore(MAX_CONCURRENT_AGENTS)
+            self._started = True
+            for agent in self.agent_manager.get_all_agents():
+                self._ensure_pump(agent)
+            if all([self.endpoint, self.deployment, self.key]):
+                # open the realtime connections of the active agents ahead of time
+                for agent in self.agent_manager.get_all_agents():
+                    if agent.is_active():
+                        agent.start_prewarm_openai_ws(self._realtime_url(), self._realtime_headers())
+
+        @self.app.on_event("shutdown")
+        async def shutdown_event():
+            self._started = False
+            pumps = list(self._agent_pumps.values())
+            self._agent_pumps.clear()
+            for task in pumps:
+                task.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+            for agent in self.agent_manager.get_all_agents():
+                await agent.close_openai_ws()
+                if agent._session is not None:
+                    agent._session.flush()
+            if self._log_task is not None:
+                self._log_task.cancel()
+                await asyncio.gather(self._log_task, return_exceptions=True)
+                self._log_task = None
+            # print whatever the worker didn't get to, later messages go straight to the console
+            log_queue, self._log_queue = self._log_queue, None
+            while log_queue is not None and not log_queue.empty():
+                message, style = log_queue.get_nowait()
+                self.console.print(message, style=style)
 
         @self.app.websocket("/health")
         async def health_check(websocket: WebSocket):
             await websocket.accept()
             await websocket.close()
 
-    async def _handle_inter_agent_communication(self):
+    def _log(self, message: str, style: Optional[str] = None, debug: bool = False) -> None:
+        """Queue a rich console message so that the caller doesn't block on printing.
+
+        Debug messages are only shown when MAHILO_LOG_LEVEL is DEBUG.
+        """
+        if debug and not logger.isEnabledFor(logging.DEBUG):
+            return
+        if self._log_queue is None:
+            self.console.print(message, style=style)
+            return
+        try:
+            self._log_queue.put_nowait((message, style))
+        except asyncio.QueueFull:
+            # drop the message rather than slow down the event loop, unless it's an error
+            if style == "red":
+                self.console.print(message, style=style)
+
+    async def _log_worker(self) -> None:
+        """Print the queued console messages, rendering them in a worker thread."""
         while True:
-            for agent in self.agent_manager.get_all_agents():
-                if agent.is_active() and agent._queue:
-                    message = agent._queue.pop(0)
-                    websockets = []
-                    try:
-                        websockets = self.websocket_connections[agent.name].values()
-                    except KeyError:
-                        self.console.print(f"[bold yellow]⚠️  No WebSocket connections found for agent:[/bold yellow] [green]{agent.name}[/green]")
-                    list_websockets = [ws for ws in websockets]
-                    await agent.process_queue_message(message, websockets=list_websockets)
-            await asyncio.sleep(1)
+            message, style = await self._log_queue.get()
+            await asyncio.to_thread(self.console.print, message, style=style)
+
+    def _add_connection(self, agent_name: str, websocket: WebSocket) -> None:
+        """Register a websocket connection for an agent."""
+        connections = self.websocket_connections[agent_name]
+        connections.add(websocket)
+        self._agent_ws_snapshot[agent_name] = list(connections)
+
+    def _remove_connection(self, agent_name: str, websocket: WebSocket) -> None:
+        """Remove a websocket connection of an agent."""
+        connections = self.websocket_connections[agent_name]
+        connections.discard(websocket)
+        self._agent_ws_snapshot[agent_name] = list(connections)
+        if not connections:
+            self._log(f"[dim]No connections left for agent:[/dim] [green]{agent_name}[/green]", debug=True)
+
+    def _realtime_url(self) -> str:
+        """Return the URL of the Azure OpenAI realtime endpoint."""
+        # add params to the url without using urllib
+        return f"{self.endpoint}/openai/realtime?api-version=2024-10-01-preview&deployment={self.deployment}"
+
+    def _realtime_headers(self) -> Dict[str, str]:
+        """Return the headers used to authenticate with the realtime endpoint."""
+        headers = {}
+        if self.key is not None:
+            headers = { "api-key": self.key }
+        return headers
+
+    def _on_agent_registered(self, agent: BaseAgent) -> None:
+        """Start processing the queue messages of an agent registered while the server runs."""
+        # before startup there's no event loop yet, startup starts the tasks
+        if self._started:
+            self._ensure_pump(agent)
+
+    def _on_agent_unregistered(self, agent: BaseAgent) -> None:
+        """Stop processing the queue messages of an unregistered agent."""
+        # an agent registered later under the same name gets a task of its own
+        task = self._agent_pumps.pop(agent.name, None)
+        if task is not None:
+            task.cancel()
+
+    def _ensure_pump(self, agent: BaseAgent) -> None:
+        """Start the task that processes the queue messages of an agent, if it isn't running."""
+        task = self._agent_pumps.get(agent.name)
+        if task is None or task.done():
+            agent.bind_to_running_loop()
+            self._agent_pumps[agent.name] = asyncio.create_task(self._pump_agent(agent))
+
+    async def _pump_agent(self, agent: BaseAgent) -> None:
+        """Process the messages that other agents send to an agent as soon as they arrive."""
+        # every agent has its own task, so a slow LLM call for one agent
+        # doesn't hold up the others
+        while True:
+            # nothing restarts this task, so an error must not end it
+            try:
+                # messages that arrived while the agent was busy are processed together,
+                # one line each, so that a burst costs a single LLM call
+                messages = await agent.next_queue_messages(QUEUE_BATCH_SIZE)
+                message = "\n".join(messages)
+                # the messages of an agent that isn't active yet wait until it is activated
+                while not agent.is_active():
+                    await asyncio.sleep(INACTIVE_AGENT_POLL_INTERVAL)
+                list_websockets = self._agent_ws_snapshot.get(agent.name, [])
+                if not list_websockets:
+                    self._log(f"[bold yellow]⚠️  No WebSocket connections found for agent:[/bold yellow] [green]{agent.name}[/green]")
+                await self._process_queue_message(agent, message, list_websockets)
+            except Exception as e:
+                self._log(f"[bold red]⛔  Error processing queue message for agent[/bold red] [green]{agent.name}[/green]: {str(e)}", style="red")
+
+    async def _process_queue_message(self, agent: BaseAgent, message: str, websockets: List[WebSocket]) -> None:
+        """Process a queue message, limiting how many agents call the LLM at once."""
+        if self._agent_semaphore is None:
+            self._agent_semaphore = asyncio.Semaphore(MAX_CONCURRENT_AGENTS)
+        async with self._agent_semaphore:
+            await agent.process_queue_message(message, websockets=websockets)
     
     def run(self, host: str = "0.0.0.0", port: int = 8000):
-        uvicorn.run(self.app, host=host, port=port)
\ No newline at end of file
+        # mahilo's debug logs are off unless asked for, e.g. MAHILO_LOG_LEVEL=DEBUG
+        level_name = os.getenv("MAHILO_LOG_LEVEL", "WARNING").upper()
+        level = logging.getLevelName(level_name)
+        if not isinstance(level, int):
+            # getLevelName returns "Level <name>" for names it doesn't know
+            self.console.print(f"[bold yellow]⚠️  Unknown MAHILO_LOG_LEVEL[/bold yellow] {level_name!r}, using WARNING")
+            level = logging.WARNING
+        logging.basicConfig(level=level)
+        uvicorn.run(
+            self.app,
+            host=host,
+            port=port,
+            loop=_UVICORN_LOOP,
+            http=_UVICORN_HTTP,
+            ws="websockets",
+            ws_per_message_deflate=True,
+        )
\ No newline at end of file
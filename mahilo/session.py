@@ -7,48 +7,190 @@ add_message and get_last_n_messages.
 This session class will be an attribute in the BaseAgent class from the agent_manager.py snippet.
 Every agent will have its own session to keep track of the conversation with the user.
 """
+import itertools
 import json
+import logging
 import os
-from typing import Dict, List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# orjson serializes straight to bytes and is several times faster than json;
+# fall back to json when it isn't installed.
+try:
+    import orjson
+
+    def _dumps(message: Dict[str, str]) -> bytes:
+        return orjson.dumps(message)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(message: Dict[str, str]) -> bytes:
+        return json.dumps(message).encode()
+
+    _loads = json.loads
+
+# number of messages kept in memory per session. The session file on disk is the
+# source of truth for the full history; only its tail is held in RAM.
+MAX_IN_MEMORY_MESSAGES = 1024
+
+# size of the blocks read backwards from the end of the session file when loading its tail
+_TAIL_READ_CHUNK_SIZE = 64 * 1024
+
+# a single thread writes all session files in the background, in the order the writes
+# were made, so that saving a message doesn't block the event loop on disk I/O.
+# Pending writes are finished before the interpreter exits.
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mahilo-session-writer")
+
+# the last write handed to the writer thread for each session file, see Session.flush
+_pending_writes: Dict[str, Future] = {}
+
 class Session:
     """A class to manage the conversation between the user and the agent.
     
     The session messages have two types:
     - User messages
     - Agent messages
+
+    Only the last MAX_IN_MEMORY_MESSAGES messages are kept in `messages`, older ones
+    are only available in the session file.
     """
-    def __init__(self, agent_name: str, server_id: str = None):
+    def __init__(self, agent_name: str, server_id: str = None, legacy_name: str = None):
+        """Create the session of an agent and load its saved messages.
+
+        Args:
+            agent_name (str): Name of the agent, the session file is named after it
+            server_id (str, optional): Keeps the sessions of each server in their own directory
+            legacy_name (str, optional): Name the session file used to have, e.g. the agent's
+                type. An existing file under it is moved to the new name.
+        """
         self.agent_name = agent_name
-        self.messages: List[Dict[str, str]] = []
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=MAX_IN_MEMORY_MESSAGES)
+        # the newest message that has been written to the session file
+        self._last_saved: Optional[Dict[str, str]] = None
         
         # Create a unique directory for each server instance
         self.server_dir = f"sessions/{server_id}" if server_id else "sessions"
         Path(self.server_dir).mkdir(parents=True, exist_ok=True)
         
         self.file_path = os.path.join(self.server_dir, f"{agent_name}.json")
+        if legacy_name and legacy_name != agent_name:
+            self._migrate_file(os.path.join(self.server_dir, f"{legacy_name}.json"))
         self.load_messages()
 
+    def _migrate_file(self, legacy_path: str):
+        """Move the session file from its legacy path, unless there is a file already."""
+        if os.path.exists(self.file_path) or not os.path.exists(legacy_path):
+            return
+        pending_write = _pending_writes.get(legacy_path)
+        if pending_write is not None:
+            pending_write.result()
+        try:
+            os.replace(legacy_path, self.file_path)
+            logger.info("Moved session file %s to %s", legacy_path, self.file_path)
+        except OSError as e:
+            logger.error("Error moving session file %s: %s", legacy_path, e)
+
     def load_messages(self):
+        # an earlier session of the same agent may still be writing to the file
+        self.flush()
         if os.path.exists(self.file_path):
             try:
-                with open(self.file_path, "r") as file:
-                    self.messages = [json.loads(line) for line in file.read().splitlines()]
+                lines = self._read_last_lines(MAX_IN_MEMORY_MESSAGES)
+                self.messages = deque(
+                    (_loads(line) for line in lines if line.strip()),
+                    maxlen=MAX_IN_MEMORY_MESSAGES,
+                )
+                self._trim_window()
             except Exception as e:
-                print(f"Error loading messages: {e}")
-                self.messages = []
+                logger.error("Error loading messages: %s", e)
+                self.messages = deque(maxlen=MAX_IN_MEMORY_MESSAGES)
+        self._last_saved = self.messages[-1] if self.messages else None
+
+    def _read_last_lines(self, n: int) -> List[bytes]:
+        """Read the last n lines of the session file without reading all of it."""
+        with open(self.file_path, "rb") as file:
+            position = file.seek(0, os.SEEK_END)
+            data = b""
+            while position > 0 and data.count(b"\n") <= n:
+                chunk_size = min(_TAIL_READ_CHUNK_SIZE, position)
+                position -= chunk_size
+                file.seek(position)
+                data = file.read(chunk_size) + data
+        lines = data.splitlines()
+        # the first line is partial if we stopped before the start of the file
+        if position > 0:
+            lines = lines[1:]
+        return lines[-n:]
+
+    def _trim_window(self):
+        """Drop tool results from the start of the in-memory window.
+
+        The window is cut at an arbitrary message when it is loaded or when old
+        messages are evicted, and the LLM rejects a history that starts with the
+        result of a tool call whose assistant message was cut off. Only call it
+        once the messages are saved: it trims the in-memory view, the session
+        file keeps every message.
+        """
+        while (
+            self.messages
+            and self.messages[0].get("role") == "tool"
+            # the last saved message marks where the unsaved messages start
+            and self.messages[0] is not self._last_saved
+        ):
+            self.messages.popleft()
+
+    def _unsaved_messages(self) -> List[Dict[str, str]]:
+        """Return the in-memory messages that are newer than the last saved one."""
+        for i, message in enumerate(reversed(self.messages)):
+            if message is self._last_saved:
+                return list(self.messages)[len(self.messages) - i:]
+        return list(self.messages)
 
     def save_messages(self):
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        
+        """Append the messages that are not in the session file yet to it."""
+        try:
+            unsaved_messages = self._unsaved_messages()
+            if unsaved_messages:
+                self._write("ab", unsaved_messages)
+                self._last_saved = unsaved_messages[-1]
+            # new messages may have evicted the start of a turn
+            self._trim_window()
+        except Exception as e:
+            logger.error("Error saving messages: %s", e)
+
+    def _rewrite_messages(self, messages: List[Dict[str, str]]):
+        """Replace the contents of the session file with the given messages."""
         try:
-            with open(self.file_path, "w") as file:
-                for message in self.messages:
-                    file.write(f"{json.dumps(message)}\n")
+            self._write("wb", messages)
+            self._last_saved = self.messages[-1] if self.messages else None
         except Exception as e:
-            print(f"Error saving messages: {e}")
+            logger.error("Error saving messages: %s", e)
+
+    def _write(self, mode: str, messages: List[Dict[str, str]]):
+        """Serialize the messages and hand them to the writer thread."""
+        # serialize here, the messages may change once this returns
+        data = b"".join(_dumps(message) + b"\n" for message in messages)
+        _pending_writes[self.file_path] = _writer.submit(self._write_file, mode, data)
+
+    def _write_file(self, mode: str, data: bytes):
+        """Write serialized messages to the session file, runs in the writer thread."""
+        try:
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(self.file_path, mode) as file:
+                file.write(data)
+        except Exception as e:
+            logger.error("Error saving messages: %s", e)
+
+    def flush(self):
+        """Wait until the messages saved so far are written to the session file."""
+        pending_write = _pending_writes.get(self.file_path)
+        if pending_write is not None:
+            pending_write.result()
 
     def add_message(self, message: str, sender: str):
         """Add a message to the session."""
@@ -60,17 +202,35 @@ class Session:
         
         The format should be
         [{"content": message, "role": sender}],
+
+        If `messages` is the session's own `messages` (appended to in place),
+        only the new messages are appended to the session file.
         """
-        self.messages = messages
-        self.save_messages()
+        if messages is self.messages:
+            self.save_messages()
+            return
+        self.messages = deque(messages, maxlen=MAX_IN_MEMORY_MESSAGES)
+        self._rewrite_messages(messages)
+        self._trim_window()
 
     def get_last_n_messages(self, n: int) -> List[Dict[str, str]]:
         """Get the last n messages, ensuring they're in pairs."""
-        messages = self.messages[-n:]
+        if n <= 0:
+            # keep the slicing semantics of the list the messages used to be in,
+            # e.g. n=0 returns the whole history
+            history = list(self.messages)
+            messages = history[-n:]
+            if len(messages) > 1 and len(messages) % 2 != 0:
+                messages = history[-(n + 1):]
+            return messages
+        count = min(n, len(self.messages))
         # If we have an odd number of messages and more than one message,
         # include one more to ensure we have complete pairs
-        if len(messages) > 1 and len(messages) % 2 != 0:
-            messages = self.messages[-(n+1):]
+        if count > 1 and count % 2 != 0:
+            count = min(count + 1, len(self.messages))
+        # walk the deque from its end so that only the returned messages are copied
+        messages = list(itertools.islice(reversed(self.messages), count))
+        messages.reverse()
         return messages
 
     
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""System prompts of the agent templates.
+
+The prompts are stored as text files in the `prompts` directory next to this module
+and are only read when they are first accessed, e.g. `_prompts.POLICE_PROXY_PROMPT`
+reads `prompts/police_proxy.txt`. Importing a template therefore doesn't load the
+prompts of all the other templates.
+"""
+from importlib import resources
+from typing import Callable, Dict
+
+_cache: Dict[str, str] = {}
+
+
+def _load(name: str) -> str:
+    """Read the prompt with the given constant name from its text file."""
+    file_name = f"{name[:-len('_PROMPT')].lower()}.txt"
+    return resources.files(__package__).joinpath("prompts", file_name).read_text(encoding="utf-8")
+
+
+def __getattr__(name: str) -> str:
+    if name in _cache:
+        return _cache[name]
+    if name.endswith("_PROMPT"):
+        try:
+            _cache[name] = _load(name)
+            return _cache[name]
+        except FileNotFoundError:
+            pass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class Prompt:
+    """Class attribute that resolves to a prompt, reading it on first access.
+
+    Agent templates declare their prompt once on the class, e.g.
+    `description = Prompt("POLICE_PROXY_PROMPT")`, and every instance shares it.
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None) -> str:
+        return __getattr__(self.name)
+
+
+def reexport(module_name: str, *names: str) -> Callable[[str], str]:
+    """Return a module `__getattr__` that lazily exposes the given prompts.
+
+    Template modules use this to keep their prompt constants importable
+    without reading the prompt when the module itself is imported.
+    """
+    def module_getattr(name: str) -> str:
+        if name in names:
+            return __getattr__(name)
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+    return module_getattr
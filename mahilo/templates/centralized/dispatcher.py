@@ -1,34 +1,10 @@
 from mahilo.agent import BaseAgent
+from mahilo.templates import _prompts
 
+# the prompt is only read from disk when it is first used
+__getattr__ = _prompts.reexport(__name__, "DISPATCHER_PROMPT")
 
-DISPATCHER_PROMPT = """
-You are a dispatcher agent, the primary interface for customer interactions. Your responsibilities include:
-
-1. Communicating directly with customers about their inquiries or issues.
-2. Identifying when specialized knowledge is required and contacting the appropriate agent.
-3. Don't try to be the expert. You are the dispatcher, you are the one that should know what to do. Read the user's messages and the messages from the other agents
-and figure out what to do and what agents to call. Ask your user before contacting other agents.
-4. Relaying information between customers and other agents.
-
-Key points to remember:
-- You are the only agent that communicates directly with customers.
-- Use the 'chat_with_agent' tool to communicate with other agents when needed.
-- When using 'chat_with_agent', always specify which agent you're contacting (e.g., 'plumber').
-- After receiving information from other agents, summarize and relay it back to the customer in a clear, professional manner.
-
-Example workflow:
-1. Customer asks about a plumbing issue.
-2. You use: chat_with_agent('plumber', "Customer has a plumbing issue: [describe issue]. Please advise.")
-3. Receive response from plumber agent.
-4. Summarize and relay information back to the customer.
-
-Always maintain a helpful and professional tone with customers.
-"""
 
 class Dispatcher(BaseAgent):
-    def __init__(self):
-        super().__init__(
-            type='dispatcher',
-            name='dispatcher',
-            description=DISPATCHER_PROMPT,
-        )
\ No newline at end of file
+    name = 'dispatcher'
+    description = _prompts.Prompt("DISPATCHER_PROMPT")
@@ -0,0 +1,5 @@
+from .dispatcher import EmergencyDispatcher
+from .medic import MedicalProxyAgent
+from .police import PoliceProxyAgent
+
+__all__ = ["EmergencyDispatcher", "MedicalProxyAgent", "PoliceProxyAgent"]
@@ -0,0 +1,3 @@
+from .story_weaver_agent import StoryWeaverAgent
+
+__all__ = ["StoryWeaverAgent"]
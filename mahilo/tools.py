@@ -1,6 +1,34 @@
-from typing import Callable
+import asyncio
+import hashlib
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
 from .registry import GlobalRegistry
 
+# messages sent with chat_with_agent during the current turn of an agent, keyed by
+# (agent name, digest of the normalized message). None outside of a turn.
+_turn_cache: ContextVar[Optional[Dict[Tuple[str, bytes], str]]] = ContextVar("_turn_cache", default=None)
+
+# reply of the chat_with_agent tools once a message is queued for another agent
+format_queued_confirmation = (
+    "I have put the question '{question}' in the queue for the agent named {agent_name}. "
+    "You will hear back soon."
+).format
+
+# reply of the chat_with_agent tools when the other agent's queue is full
+format_queue_full = (
+    "The agent named {agent_name} has too many messages waiting and didn't take yours. "
+    "Try again after it has answered."
+).format
+
+def start_turn() -> None:
+    """Start a new turn of an agent, forgetting the messages sent in the previous one."""
+    _turn_cache.set({})
+
+def _message_key(agent_name: str, question: str) -> Tuple[str, bytes]:
+    """Key a message by its recipient and its text, ignoring case and whitespace."""
+    normalized = " ".join(question.split()).lower()
+    return agent_name, hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+
 def get_chat_with_agent_tool() -> Callable:
     """Get the chat_with_agent tool that can be bound to LLMs."""
 
@@ -13,17 +41,38 @@ def get_chat_with_agent_tool() -> Callable:
         agent = registry.get_agent(agent_name)
         if not agent:
             return f"Error: Agent '{agent_name}' not found"
+
+        # don't send the same message to the same agent twice in one turn
+        turn_cache = _turn_cache.get()
+        if turn_cache is not None:
+            key = _message_key(agent_name, question)
+            if key in turn_cache:
+                return turn_cache[key]
+
+        sender = registry.get_agent(your_name)
+        if sender is not None and sender.wait_for_reply and agent_name in sender._awaiting_reply:
+            return (
+                f"You have already asked the agent named {agent_name} and it hasn't answered yet. "
+                "Don't ask it again until it does."
+            )
             
         # if agent is not active, activate it
         if not agent.is_active():
             agent.activate()
             
         # add the question to the agent's queue
-        agent.add_message_to_queue(question, your_name)
+        try:
+            agent.add_message_to_queue(question, your_name)
+        except asyncio.QueueFull:
+            return format_queue_full(agent_name=agent_name)
+        if sender is not None:
+            sender._awaiting_reply.add(agent_name)
+        # a message from the agent to the sender counts as its answer
+        agent._awaiting_reply.discard(your_name)
         
-        return (
-            f"I have put the question '{question}' in the queue for the agent named {agent_name}. "
-            "You will hear back soon."
-        )
+        response = format_queued_confirmation(question=question, agent_name=agent_name)
+        if turn_cache is not None:
+            turn_cache[key] = response
+        return response
     
     return chat_with_agent
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+# the agent module needs the server dependencies and creates an OpenAI client on import,
+# no request is sent with the key
+for module in ("openai", "fastapi", "websockets", "rich"):
+    pytest.importorskip(module)
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from mahilo import agent as agent_module  # noqa: E402
+from mahilo.agent import BaseAgent  # noqa: E402
+from mahilo.agent_manager import AgentManager  # noqa: E402
+from mahilo.registry import GlobalRegistry  # noqa: E402
+from mahilo.tools import format_queue_full  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_dir(tmp_path, monkeypatch):
+    # activating an agent creates its session file relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    yield
+    GlobalRegistry.set_agent_registry(None)
+
+
+def test_full_queue_is_reported_to_the_sender(monkeypatch):
+    monkeypatch.setattr(agent_module, "MAX_QUEUE_SIZE", 2)
+    manager = AgentManager()
+    dispatcher = BaseAgent(type="dispatcher", name="dispatcher")
+    medic = BaseAgent(type="medic", name="medic")
+    manager.register_agent(dispatcher)
+    manager.register_agent(medic)
+
+    dispatcher.chat_with_agent("medic", "first")
+    dispatcher.chat_with_agent("medic", "second")
+    response = dispatcher.chat_with_agent("medic", "third")
+
+    assert response == format_queue_full(agent_name="medic")
+    assert medic.queue_size() == 2
+
+
+def test_put_from_another_thread_wakes_up_the_waiting_loop():
+    medic = BaseAgent(type="medic", name="medic")
+
+    async def wait_for_message():
+        medic.bind_to_running_loop()
+        waiter = asyncio.create_task(medic.next_queue_messages(10))
+        # let the waiter block on the empty queue before the other thread puts
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=medic.add_message_to_queue, args=("Where is the patient?", "dispatcher"))
+        thread.start()
+        thread.join()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert asyncio.run(wait_for_message()) == ["dispatcher: Where is the patient?"]
+
+
+def test_queue_moves_to_the_loop_of_the_next_run():
+    medic = BaseAgent(type="medic", name="medic")
+
+    async def first_run():
+        medic.bind_to_running_loop()
+        medic.add_message_to_queue("first", "dispatcher")
+        return await medic.next_queue_messages(10)
+
+    async def second_run():
+        medic.bind_to_running_loop()
+        return await asyncio.wait_for(medic.next_queue_messages(10), timeout=1)
+
+    assert asyncio.run(first_run()) == ["dispatcher: first"]
+    # sent between the runs, e.g. while the server restarts
+    medic.add_message_to_queue("second", "dispatcher")
+    assert asyncio.run(second_run()) == ["dispatcher: second"]
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from mahilo import session as session_module
+from mahilo.session import Session
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_dir(tmp_path, monkeypatch):
+    # sessions are written to a "sessions" directory relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def read_lines(session: Session):
+    session.flush()
+    with open(session.file_path) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_round_trip():
+    session = Session("agent")
+    session.add_message("hello", "user")
+    session.add_message("hi, how can I help?", "assistant")
+    session.flush()
+
+    reloaded = Session("agent")
+
+    assert list(reloaded.messages) == [
+        {"content": "hello", "role": "user"},
+        {"content": "hi, how can I help?", "role": "assistant"},
+    ]
+
+
+def test_append_without_duplicates_across_eviction(monkeypatch):
+    monkeypatch.setattr(session_module, "MAX_IN_MEMORY_MESSAGES", 4)
+    session = Session("agent")
+    for i in range(5):
+        session.add_message(f"question {i}", "user")
+        session.add_message(f"answer {i}", "assistant")
+    # agents append to the session's own messages in place and save them at the end of a turn
+    session.messages.append({"content": "question 5", "role": "user"})
+    session.messages.append({"content": "answer 5", "role": "assistant"})
+    session.update_and_replace_messages(session.messages)
+
+    expected = []
+    for i in range(6):
+        expected += [{"content": f"question {i}", "role": "user"}, {"content": f"answer {i}", "role": "assistant"}]
+    assert read_lines(session) == expected
+    assert list(session.messages) == expected[-4:]
+
+
+def test_reload_reads_only_the_tail(monkeypatch):
+    session = Session("agent")
+    for i in range(20):
+        session.add_message(f"message {i}", "user")
+    session.flush()
+    monkeypatch.setattr(session_module, "MAX_IN_MEMORY_MESSAGES", 5)
+    # read the file in blocks smaller than a line so that the tail read has to stitch them
+    monkeypatch.setattr(session_module, "_TAIL_READ_CHUNK_SIZE", 16)
+
+    reloaded = Session("agent")
+
+    assert [m["content"] for m in reloaded.messages] == [f"message {i}" for i in range(15, 20)]
+
+
+def test_reload_drops_orphaned_tool_results(monkeypatch):
+    session = Session("agent")
+    session.update_and_replace_messages([
+        {"content": "question", "role": "user"},
+        {"content": "", "role": "assistant"},
+        {"content": "result", "role": "tool"},
+        {"content": "answer", "role": "assistant"},
+    ])
+    session.flush()
+    monkeypatch.setattr(session_module, "MAX_IN_MEMORY_MESSAGES", 2)
+
+    reloaded = Session("agent")
+
+    assert list(reloaded.messages) == [{"content": "answer", "role": "assistant"}]
+
+
+def test_window_keeps_a_leading_assistant_message():
+    session = Session("agent")
+    session.add_message("welcome!", "assistant")
+    session.add_message("hello", "user")
+
+    assert [m["content"] for m in session.messages] == ["welcome!", "hello"]
+    assert [m["content"] for m in read_lines(session)] == ["welcome!", "hello"]
+
+
+def test_get_last_n_messages():
+    session = Session("agent")
+    for i in range(4):
+        session.add_message(f"message {i}", "user")
+
+    assert [m["content"] for m in session.get_last_n_messages(2)] == ["message 2", "message 3"]
+    # an odd count is rounded up to complete pairs
+    assert [m["content"] for m in session.get_last_n_messages(3)] == ["message 0", "message 1", "message 2", "message 3"]
+    assert session.get_last_n_messages(0) == list(session.messages)
+
+
+def test_moves_the_session_file_of_the_legacy_name():
+    legacy = Session("story_weaver")
+    legacy.add_message("hello", "user")
+    legacy.flush()
+
+    session = Session("alice", legacy_name="story_weaver")
+
+    assert list(session.messages) == [{"content": "hello", "role": "user"}]
+    assert not os.path.exists(legacy.file_path)
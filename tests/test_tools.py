@@ -0,0 +1,110 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+
+import pytest
+
+from mahilo.registry import GlobalRegistry
+from mahilo.tools import format_queue_full, format_queued_confirmation, get_chat_with_agent_tool, start_turn
+
+
+class FakeAgent:
+    """The part of BaseAgent that the chat_with_agent tool uses."""
+
+    def __init__(self, name: str, wait_for_reply: bool = False, queue_full: bool = False):
+        self.name = name
+        self.wait_for_reply = wait_for_reply
+        self.queue_full = queue_full
+        self.queue: List[str] = []
+        self._awaiting_reply: Set[str] = set()
+
+    def is_active(self) -> bool:
+        return True
+
+    def add_message_to_queue(self, message: str, sender: str) -> None:
+        if self.queue_full:
+            raise asyncio.QueueFull
+        self.queue.append(f"{sender}: {message}")
+
+
+class FakeRegistry:
+    def __init__(self, *agents: FakeAgent):
+        self.agents = {agent.name: agent for agent in agents}
+
+    def get_agent(self, agent_name: str) -> Optional[FakeAgent]:
+        return self.agents.get(agent_name)
+
+    def get_agent_types_with_description(self) -> Dict[str, str]:
+        return {}
+
+
+@pytest.fixture
+def registry():
+    def set_agents(*agents: FakeAgent) -> FakeRegistry:
+        registry = FakeRegistry(*agents)
+        GlobalRegistry.set_agent_registry(registry)
+        return registry
+
+    yield set_agents
+    GlobalRegistry.set_agent_registry(None)
+
+
+def test_repeated_message_is_sent_once_per_turn(registry):
+    medic = FakeAgent("medic")
+    registry(FakeAgent("dispatcher"), medic)
+    chat_with_agent = get_chat_with_agent_tool()
+
+    start_turn()
+    first = chat_with_agent("medic", "dispatcher", "Where is the patient?")
+    # same message up to case and whitespace
+    second = chat_with_agent("medic", "dispatcher", "  where is   the patient? ")
+
+    assert second == first
+    assert medic.queue == ["dispatcher: Where is the patient?"]
+
+    start_turn()
+    chat_with_agent("medic", "dispatcher", "Where is the patient?")
+
+    assert len(medic.queue) == 2
+
+
+def test_wait_for_reply_blocks_until_the_agent_answers(registry):
+    dispatcher = FakeAgent("dispatcher", wait_for_reply=True)
+    medic = FakeAgent("medic")
+    registry(dispatcher, medic)
+    chat_with_agent = get_chat_with_agent_tool()
+
+    start_turn()
+    chat_with_agent("medic", "dispatcher", "Where is the patient?")
+    refused = chat_with_agent("medic", "dispatcher", "Is the patient conscious?")
+
+    assert "hasn't answered yet" in refused
+    assert len(medic.queue) == 1
+
+    # the medic's answer counts as the reply
+    chat_with_agent("dispatcher", "medic", "At the station.")
+    chat_with_agent("medic", "dispatcher", "Is the patient conscious?")
+
+    assert len(medic.queue) == 2
+
+
+def test_full_queue_is_reported_to_the_sender(registry):
+    dispatcher = FakeAgent("dispatcher", wait_for_reply=True)
+    registry(dispatcher, FakeAgent("medic", queue_full=True))
+    chat_with_agent = get_chat_with_agent_tool()
+    start_turn()
+
+    response = chat_with_agent("medic", "dispatcher", "Where is the patient?")
+
+    assert response == format_queue_full(agent_name="medic")
+    # a message that wasn't queued isn't waiting for an answer
+    assert "medic" not in dispatcher._awaiting_reply
+
+
+def test_queued_message_is_confirmed(registry):
+    registry(FakeAgent("dispatcher"), FakeAgent("medic"))
+    chat_with_agent = get_chat_with_agent_tool()
+    start_turn()
+
+    response = chat_with_agent("medic", "dispatcher", "Where is the patient?")
+
+    assert response == format_queued_confirmation(question="Where is the patient?", agent_name="medic")